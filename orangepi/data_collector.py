@@ -11,11 +11,17 @@ import time
 import csv
 import json
 import yaml
+import numpy as np
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
 import threading
-import queue
+import select
+
+try:
+    import orjson  # Faster JSON Lines output; falls back to json
+except ImportError:
+    orjson = None
 
 
 class UltrasonicDataCollector:
@@ -26,12 +32,44 @@ class UltrasonicDataCollector:
         self.config = self._load_config(config_path)
         self.serial_conn: Optional[serial.Serial] = None
         self.is_running = False
-        self.data_buffer = []
-        self.data_queue = queue.Queue()
+        
+        # Settings used on the read/write paths, bound once so the hot
+        # loops don't walk the config dict per sample
+        self._num_sensors = self.config['sensors']['count']
+        self._readings_per_trigger = self.config['sensors'].get('readings_per_trigger', 10)
+        self._buffer_size = self.config['data']['buffer_size']
+        self._is_csv = self.config['data']['file_format'] == 'csv'
+        
+        # Line layout is fixed for the session, so the parser reshapes
+        # straight to this
+        self._reading_shape = (self._num_sensors, self._readings_per_trigger)
+        
+        # CSV header: timestamp, sensor_id, reading_1, reading_2, ..., reading_N
+        self._csv_header = ('system_timestamp', 'arduino_timestamp_ms', 'sensor_id',
+                            *(f'reading_{j+1}' for j in range(self._readings_per_trigger)))
+        
+        # Ring buffer between the read and write threads, preallocated so a
+        # sample is copied into a slot rather than queued as new objects.
+        # Single producer/single consumer: the reader only advances
+        # buffer_tail and the writer only advances buffer_head, so no lock
+        # is taken per entry.
+        self._ring_size = 4 * self._buffer_size
+        self.buffer_system_ts = np.empty(self._ring_size, dtype=np.int64)  # time.time_ns()
+        self.buffer_arduino_ts = np.empty(self._ring_size, dtype=np.int64)
+        self.buffer_readings = np.empty((self._ring_size, *self._reading_shape), dtype=np.int32)
+        self.buffer_head = 0  # Entries written so far
+        self.buffer_tail = 0  # Entries read so far
+        
+        # Wakes the writer once a full batch is waiting in the ring
+        self.data_ready = threading.Event()
+        self.read_thread: Optional[threading.Thread] = None
+        self.write_thread: Optional[threading.Thread] = None
+        self.output_path: Optional[Path] = None
+        self.output_file = None
         
         # Create output directory if it doesn't exist
-        output_dir = Path(self.config['data']['output_directory'])
-        output_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir = Path(self.config['data']['output_directory'])
+        self.output_dir.mkdir(parents=True, exist_ok=True)
         
     def _load_config(self, config_path: str) -> Dict:
         """Load configuration from YAML file."""
@@ -47,6 +85,13 @@ class UltrasonicDataCollector:
                 timeout=self.config['arduino']['timeout']
             )
             
+            # Request ASYNC_LOW_LATENCY so USB-serial adapters don't hold
+            # bytes for their 16ms latency timer (Linux only)
+            try:
+                self.serial_conn.set_low_latency_mode(True)
+            except (AttributeError, ValueError):
+                pass
+            
             # Wait for Arduino to initialize
             time.sleep(2)
             
@@ -91,6 +136,7 @@ class UltrasonicDataCollector:
         
         if response and "ACK:STARTED" in response:
             self.is_running = True
+            self._open_output_file()
             
             # Start data reading thread
             self.read_thread = threading.Thread(target=self._read_data_loop, daemon=True)
@@ -109,144 +155,211 @@ class UltrasonicDataCollector:
     def stop_collection(self):
         """Stop data collection."""
         self.is_running = False
+        
+        # Let the reader finish its current line so it can't consume the
+        # STOP acknowledgment, then let the writer drain the queue
+        if self.read_thread:
+            self.read_thread.join()
         self.send_command("STOP")
+        if self.write_thread:
+            self.data_ready.set()  # Wake the writer so it sees is_running
+            self.write_thread.join()
         
         # Flush remaining data
         self._flush_buffer()
         
+        if self.output_file:
+            self.output_file.close()
+            self.output_file = None
+        
         print("Stopped data collection")
     
     def _read_data_loop(self):
         """Continuously read data from Arduino (runs in separate thread)."""
+        residual = b''  # Partial line carried over to the next read
+        
+        # POSIX ports expose their file descriptor so we can wait on it with
+        # select(); other platforms fall back to a blocking 1-byte read
+        fd = getattr(self.serial_conn, 'fd', None)
+        
         while self.is_running:
             try:
-                if self.serial_conn and self.serial_conn.in_waiting:
-                    line = self.serial_conn.readline().decode('utf-8').strip()
-                    
-                    if line.startswith('S,'):
+                if fd is not None:
+                    # Sleep in the kernel until the port is readable
+                    readable, _, _ = select.select([fd], [], [], 0.1)
+                    if not readable:
+                        continue
+                
+                # Drain everything already buffered in one call. When idle,
+                # the 1-byte read blocks in the kernel until data arrives
+                # (or the serial timeout expires) rather than polling.
+                chunk = self.serial_conn.read(self.serial_conn.in_waiting or 1)
+                if not chunk:
+                    continue
+                
+                lines = (residual + chunk).split(b'\n')
+                residual = lines.pop()
+                
+                for raw_line in lines:
+                    if raw_line.startswith(b'S,'):
                         # Parse sensor data: S,timestamp,sensor1,sensor2,...
-                        self._parse_sensor_data(line)
-                    elif line:
-                        # Print non-data messages
-                        print(f"Arduino: {line}")
-                        
+                        # straight from the raw bytes, without decoding
+                        self._parse_sensor_data(raw_line)
+                    else:
+                        # Serial noise (e.g. at board reset) may not be valid
+                        # UTF-8; don't let it abort the rest of the chunk
+                        line = raw_line.decode('utf-8', errors='replace').strip()
+                        if line:
+                            # Print non-data messages
+                            print(f"Arduino: {line}")
+                    
+            except (serial.SerialException, OSError) as e:
+                # Port gone (e.g. USB cable pulled). A dead fd stays readable,
+                # so retrying would spin; report it once and stop instead.
+                # Closing the port lets STOP/disconnect skip the dead device.
+                print(f"Serial connection lost: {e}")
+                self.is_running = False
+                self.data_ready.set()  # Wake the writer so it sees is_running
+                self.serial_conn.close()
+                break
             except Exception as e:
                 print(f"Error reading data: {e}")
-                
-            time.sleep(0.01)  # Small delay to prevent CPU spinning
     
-    def _parse_sensor_data(self, line: str):
-        """Parse sensor data line and add to queue."""
+    def _parse_sensor_data(self, line: bytes):
+        """Parse a raw sensor data line into the next ring buffer slot."""
         try:
-            parts = line.split(',')
-            if len(parts) < 3:
+            # Split off the "S,<timestamp>," prefix
+            ts_end = line.find(b',', 2)
+            if ts_end == -1:
                 return
             
-            timestamp_ms = int(parts[1])
-            all_values = [int(v) for v in parts[2:]]
+            timestamp_ms = int(line[2:ts_end])
             
-            # Parse readings: sensor1_r1, sensor1_r2, ..., sensor2_r1, sensor2_r2, ...
-            num_sensors = self.config['sensors']['count']
-            readings_per_trigger = self.config['sensors'].get('readings_per_trigger', 10)
+            # Parse readings in C: sensor1_r1, sensor1_r2, ..., sensor2_r1, sensor2_r2, ...
+            all_values = np.fromstring(line[ts_end + 1:], dtype=np.int32, sep=',')
             
-            # Reshape data into per-sensor readings
-            sensor_readings = []
-            for i in range(num_sensors):
-                start_idx = i * readings_per_trigger
-                end_idx = start_idx + readings_per_trigger
-                sensor_readings.append(all_values[start_idx:end_idx])
+            # Reshape data into per-sensor readings (raises on a truncated line)
+            sensor_readings = all_values.reshape(self._reading_shape)
             
-            # Create data entry
-            data_entry = {
-                'system_timestamp': datetime.now().isoformat(),
-                'arduino_timestamp_ms': timestamp_ms,
-                'sensor_readings': sensor_readings  # List of lists: [[s1_r1, s1_r2, ...], [s2_r1, s2_r2, ...]]
-            }
+            tail = self.buffer_tail
+            if tail - self.buffer_head == self._ring_size:
+                print("Write buffer full, dropping sample")
+                return
+            
+            # The system time stays an integer until it is written out
+            slot = tail % self._ring_size
+            self.buffer_system_ts[slot] = time.time_ns()
+            self.buffer_arduino_ts[slot] = timestamp_ms
+            self.buffer_readings[slot] = sensor_readings
+            self.buffer_tail = tail + 1  # Publish only once the slot is filled
             
-            self.data_queue.put(data_entry)
+            if self.buffer_tail - self.buffer_head == self._buffer_size:
+                self.data_ready.set()
             
         except Exception as e:
             print(f"Error parsing sensor data: {e}")
     
     def _write_data_loop(self):
-        """Continuously write data from queue to file (runs in separate thread)."""
-        while self.is_running or not self.data_queue.empty():
+        """Continuously write data from the ring buffer to file (runs in separate thread)."""
+        while self.is_running:
             try:
-                # Get data with timeout
-                data_entry = self.data_queue.get(timeout=0.5)
-                self.data_buffer.append(data_entry)
+                if self.buffer_tail - self.buffer_head < self._buffer_size:
+                    # Wait for a full batch; the timeout bounds the delay if
+                    # a wakeup is missed and lets the loop see is_running.
+                    # A partial batch is flushed by stop_collection.
+                    self.data_ready.wait(timeout=0.5)
+                    self.data_ready.clear()
+                    continue
                 
-                # Write buffer if it reaches specified size
-                if len(self.data_buffer) >= self.config['data']['buffer_size']:
-                    self._flush_buffer()
+                self._flush_buffer()
                     
-            except queue.Empty:
-                continue
             except Exception as e:
                 print(f"Error writing data: {e}")
     
     def _flush_buffer(self):
         """Write buffered data to file."""
-        if not self.data_buffer:
+        head, tail = self.buffer_head, self.buffer_tail
+        if head == tail:
             return
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_dir = Path(self.config['data']['output_directory'])
+        # Pending entries may wrap past the end of the ring, giving up to
+        # two contiguous slot ranges
+        start = head % self._ring_size
+        stop = start + (tail - head)
+        ranges = [(start, min(stop, self._ring_size))]
+        if stop > self._ring_size:
+            ranges.append((0, stop - self._ring_size))
         
-        if self.config['data']['file_format'] == 'csv':
-            self._write_csv(output_dir / f"sensor_data_{timestamp}.csv")
-        else:
-            self._write_json(output_dir / f"sensor_data_{timestamp}.json")
+        for lo, hi in ranges:
+            if self._is_csv:
+                self._write_csv(self.output_file, lo, hi)
+            else:
+                self._write_json(self.output_file, lo, hi)
+        self.output_file.flush()
         
-        print(f"Wrote {len(self.data_buffer)} records to file")
-        self.data_buffer = []
+        print(f"Wrote {tail - head} records to file")
+        self.buffer_head = tail  # Hand the slots back to the reader
     
-    def _write_csv(self, filepath: Path):
-        """Write data buffer to CSV file with separate rows per sensor."""
-        file_exists = filepath.exists()
+    def _open_output_file(self):
+        """Choose this session's output file; every flush appends to it."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        with open(filepath, 'a', newline='') as f:
-            if not self.data_buffer:
-                return
-            
-            # Determine number of readings from first entry
-            readings_per_trigger = len(self.data_buffer[0]['sensor_readings'][0])
-            
-            # Build fieldnames: timestamp, sensor_id, reading_1, reading_2, ..., reading_N
-            fieldnames = ['system_timestamp', 'arduino_timestamp_ms', 'sensor_id']
-            for j in range(readings_per_trigger):
-                fieldnames.append(f'reading_{j+1}')
-            
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            
-            if not file_exists:
-                writer.writeheader()
-            
-            # Write separate row for each sensor
-            for entry in self.data_buffer:
-                for sensor_idx, sensor_data in enumerate(entry['sensor_readings']):
-                    row = {
-                        'system_timestamp': entry['system_timestamp'],
-                        'arduino_timestamp_ms': entry['arduino_timestamp_ms'],
-                        'sensor_id': sensor_idx + 1
-                    }
-                    for j, reading in enumerate(sensor_data):
-                        row[f'reading_{j+1}'] = reading
-                    
-                    writer.writerow(row)
+        # JSON output is written as JSON Lines so flushes can append
+        extension = 'csv' if self._is_csv else 'jsonl'
+        self.output_path = self.output_dir / f"sensor_data_{timestamp}.{extension}"
+        file_exists = self.output_path.exists()
+        
+        # Keep the file open for the whole session instead of
+        # re-opening it on every flush. The 1 MiB buffer holds a whole
+        # batch, which _flush_buffer then pushes out in one write.
+        self.output_file = open(self.output_path, 'a', newline='', buffering=1 << 20)
+        
+        if self._is_csv and not file_exists:
+            csv.writer(self.output_file).writerow(self._csv_header)
     
-    def _write_json(self, filepath: Path):
-        """Write data buffer to JSON file."""
-        existing_data = []
+    def _write_csv(self, f, start: int, stop: int):
+        """Write ring slots [start, stop) to the open CSV file with separate rows per sensor."""
+        n = stop - start
+        num_sensors, readings_per_trigger = self._reading_shape
         
-        if filepath.exists():
-            with open(filepath, 'r') as f:
-                existing_data = json.load(f)
+        # One integer row per sensor: arduino_timestamp_ms, sensor_id, readings...
+        block = np.column_stack((
+            np.repeat(self.buffer_arduino_ts[start:stop], num_sensors),
+            np.tile(np.arange(1, num_sensors + 1), n),
+            self.buffer_readings[start:stop].reshape(n * num_sensors, readings_per_trigger)
+        ))
         
-        existing_data.extend(self.data_buffer)
+        # Each entry's system timestamp is formatted once and prefixed to
+        # its sensor rows, then the whole range goes through one writerows
+        rows = block.tolist()
+        for i in range(n):
+            timestamp = self._format_timestamp(self.buffer_system_ts[start + i])
+            for j in range(i * num_sensors, (i + 1) * num_sensors):
+                rows[j].insert(0, timestamp)
+        csv.writer(f).writerows(rows)
+    
+    def _write_json(self, f, start: int, stop: int):
+        """Append ring slots [start, stop) to the open JSON Lines file, one record per line."""
+        lines = []
+        for i in range(start, stop):
+            record = {
+                'system_timestamp': self._format_timestamp(self.buffer_system_ts[i]),
+                'arduino_timestamp_ms': int(self.buffer_arduino_ts[i]),
+                'sensor_readings': self.buffer_readings[i]
+            }
+            if orjson is not None:
+                lines.append(orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY).decode())
+            else:
+                record['sensor_readings'] = record['sensor_readings'].tolist()
+                lines.append(json.dumps(record, separators=(',', ':')))
         
-        with open(filepath, 'w') as f:
-            json.dump(existing_data, f, indent=2)
+        f.write('\n'.join(lines) + '\n')
+    
+    @staticmethod
+    def _format_timestamp(timestamp_ns: int) -> str:
+        """Format a time.time_ns() value as a local ISO timestamp."""
+        seconds, nanos = divmod(int(timestamp_ns), 1_000_000_000)
+        return datetime.fromtimestamp(seconds).replace(microsecond=nanos // 1000).isoformat()
     
     @staticmethod
     def _adc_to_distance(adc_value: int) -> float:
@@ -301,7 +414,7 @@ def main():
             time.sleep(args.duration)
         else:
             print("Collecting data... Press Ctrl+C to stop")
-            while True:
+            while collector.is_running:  # Cleared if the serial link drops
                 time.sleep(1)
                 
     except KeyboardInterrupt:
@@ -17,30 +17,70 @@ import matplotlib.pyplot as plt
 import argparse
 from pathlib import Path
 from datetime import datetime
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv  # Faster multi-threaded CSV parsing
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
 
 class EchoProfileAnalyzer:
     """Analyze ultrasonic echo profile data from MB1300 sensors."""
     
-    def __init__(self, csv_file: str):
+    def __init__(self, csv_file: str, streaming: bool = False):
         """
         Initialize analyzer with CSV data file.
         
         Args:
             csv_file: Path to CSV file with sensor data
+            streaming: Only compute report statistics, reading the file in
+                chunks so memory stays bounded; plots load the full data
+                on first use
         """
         self.csv_file = Path(csv_file)
         self.df = None
         self.num_readings = 240  # Default, will be detected from data
         self.cm_per_reading = 0.86  # 50µs sampling = ~0.86cm resolution
+        self._stream_stats = None
+        self._heatmap_fig = None  # Standalone heatmap window, reused by re-plots
+        self._heatmap_im = None
         
-        self._load_data()
+        if streaming:
+            self._load_stats()
+        else:
+            self._load_data()
     
     def _load_data(self):
         """Load and validate CSV data."""
         try:
-            self.df = pd.read_csv(self.csv_file)
-            print(f"✓ Loaded {len(self.df)} rows from {self.csv_file.name}")
+            self.df = None
+            source = self.csv_file
+            if pa is not None:
+                cache_file = self.csv_file.with_suffix('.parquet')
+                if self._cache_is_fresh(cache_file):
+                    # Already parsed by an earlier run
+                    self.df = pd.read_parquet(cache_file)
+                    source = cache_file
+                else:
+                    # Signature taken before parsing, so a CSV rewritten
+                    # mid-read doesn't get a cache marked as current
+                    signature = self._csv_signature()
+                    try:
+                        self.df = self._read_csv_arrow()
+                    except pa.ArrowInvalid:
+                        pass  # Malformed values; let pandas coerce them below
+                    else:
+                        self._write_cache(cache_file, signature)
+            if self.df is None:
+                # Map the file rather than buffering it; captures can be large
+                # relative to an SBC's RAM
+                self.df = pd.read_csv(self.csv_file, memory_map=True)
+            print(f"✓ Loaded {len(self.df)} rows from {source.name}")
             
             # Detect number of readings per sensor
             reading_cols = [col for col in self.df.columns if 'reading_' in col]
@@ -48,18 +88,134 @@ class EchoProfileAnalyzer:
                 self.num_readings = len(reading_cols)
                 print(f"✓ Detected {self.num_readings} readings per sensor")
             
+            # Convert reading columns to a numeric array once and split it by
+            # sensor; every plot and report slices these instead of
+            # re-parsing and re-masking the DataFrame
+            self._reading_cols = [f'reading_{i}' for i in range(1, self.num_readings + 1)]
+            readings = self._to_readings(self.df)
+            sensor_ids = self.df['sensor_id'].to_numpy()
+            self._sensor_cache = {sensor_id: readings[sensor_ids == sensor_id]
+                                  for sensor_id in np.unique(sensor_ids)}
+            self._empty_readings = readings[:0]  # For sensors with no rows
+            self._cumsum_cache = {}  # Built per sensor by _window_mean
+            
             # Convert timestamp to datetime
             self.df['system_timestamp'] = pd.to_datetime(self.df['system_timestamp'])
             
             # Count sensors and trigger events
-            num_sensors = len(self.df['sensor_id'].unique())
-            num_triggers = len(self.df) // num_sensors
-            print(f"✓ Found {num_sensors} sensors, {num_triggers} trigger events")
+            self.sensor_ids = sorted(self._sensor_cache)
+            self.num_rows = len(self.df)
+            num_triggers = self.num_rows // len(self.sensor_ids)
+            print(f"✓ Found {len(self.sensor_ids)} sensors, {num_triggers} trigger events")
+            
+        except Exception as e:
+            print(f"✗ Error loading data: {e}")
+            raise
+    
+    def _load_stats(self, chunksize: int = 50_000):
+        """Stream the CSV in chunks, keeping only per-sensor report statistics."""
+        try:
+            stats = {}
+            self.num_rows = 0
+            
+            for chunk in pd.read_csv(self.csv_file, chunksize=chunksize):
+                if not self.num_rows:
+                    # Detect number of readings per sensor
+                    reading_cols = [col for col in chunk.columns if 'reading_' in col]
+                    if reading_cols:
+                        self.num_readings = len(reading_cols)
+                    self._reading_cols = [f'reading_{i}' for i in range(1, self.num_readings + 1)]
+                self.num_rows += len(chunk)
+                
+                readings = self._to_readings(chunk)
+                sensor_ids = chunk['sensor_id'].to_numpy()
+                
+                for sensor_id in np.unique(sensor_ids):
+                    block = readings[sensor_ids == sensor_id]
+                    block_mean = block.mean()
+                    block_m2 = ((block - block_mean) ** 2).sum()
+                    
+                    s = stats.get(sensor_id)
+                    if s is None:
+                        stats[sensor_id] = {
+                            'n': block.size, 'mean': block_mean, 'm2': block_m2,
+                            'min': block.min(), 'max': block.max(),
+                            'strong_echoes': (block > 100).sum(),
+                            'first_trigger': block[0]
+                        }
+                        continue
+                    
+                    # Merge the chunk's moments into the running ones
+                    # (Chan et al.'s pairwise form of Welford's update)
+                    n = s['n'] + block.size
+                    delta = block_mean - s['mean']
+                    s['mean'] += delta * block.size / n
+                    s['m2'] += block_m2 + delta ** 2 * s['n'] * block.size / n
+                    s['n'] = n
+                    s['min'] = min(s['min'], block.min())
+                    s['max'] = max(s['max'], block.max())
+                    s['strong_echoes'] += (block > 100).sum()
+            
+            for s in stats.values():
+                s['std'] = np.sqrt(s['m2'] / s['n'])
+            self._stream_stats = stats
+            self.sensor_ids = sorted(stats)
+            
+            num_triggers = self.num_rows // len(self.sensor_ids)
+            print(f"✓ Streamed {self.num_rows} rows from {self.csv_file.name}")
+            print(f"✓ Detected {self.num_readings} readings per sensor")
+            print(f"✓ Found {len(self.sensor_ids)} sensors, {num_triggers} trigger events")
             
         except Exception as e:
             print(f"✗ Error loading data: {e}")
             raise
     
+    def _to_readings(self, frame: pd.DataFrame) -> np.ndarray:
+        """Convert a frame's reading columns to a numeric array (bad values become 0)."""
+        # 10-bit ADC values fit in uint16, a quarter of the int64 default
+        return (frame[self._reading_cols]
+                .apply(pd.to_numeric, errors='coerce')
+                .fillna(0)
+                .to_numpy(dtype=np.uint16))
+    
+    def _read_csv_arrow(self) -> pd.DataFrame:
+        """Read the CSV with Arrow, typing ADC readings as int16 and sensor IDs as int8."""
+        with open(self.csv_file) as f:
+            header = f.readline().strip().split(',')
+        
+        column_types = {col: pa.int16() for col in header if 'reading_' in col}
+        column_types['sensor_id'] = pa.int8()
+        
+        table = pacsv.read_csv(self.csv_file,
+                               convert_options=pacsv.ConvertOptions(column_types=column_types))
+        return table.to_pandas()
+    
+    def _csv_signature(self) -> bytes:
+        """Identify the current CSV contents by mtime (ns) and size."""
+        st = self.csv_file.stat()
+        return f"{st.st_mtime_ns},{st.st_size}".encode()
+    
+    def _cache_is_fresh(self, cache_file: Path) -> bool:
+        """Check the Parquet cache was built from the CSV as it is now."""
+        # The cache records the signature of the CSV it came from and is only
+        # used on an exact match, so a CSV restored with an older mtime
+        # (cp -p, rsync -a) isn't shadowed by a stale cache
+        try:
+            metadata = pq.read_schema(cache_file).metadata or {}
+        except (OSError, pa.ArrowException):
+            return False  # Missing or unreadable; re-parse the CSV
+        return metadata.get(b'source_csv') == self._csv_signature()
+    
+    def _write_cache(self, cache_file: Path, signature: bytes):
+        """Save the parsed data as Parquet next to the CSV so later runs skip parsing."""
+        try:
+            table = pa.Table.from_pandas(self.df, preserve_index=False)
+            table = table.replace_schema_metadata(
+                {**(table.schema.metadata or {}), b'source_csv': signature})
+            pq.write_table(table, cache_file)
+        except (OSError, pa.ArrowException) as e:
+            print(f"✗ Could not write cache {cache_file.name}: {e}")
+    
     def get_sensor_data(self, sensor_id: int, row_idx: int = None) -> np.ndarray:
         """
         Extract readings for a specific sensor and row.
@@ -71,18 +227,34 @@ class EchoProfileAnalyzer:
         Returns:
             Array of readings (shape: [num_readings] or [num_rows, num_readings])
         """
-        cols = [f'reading_{i}' for i in range(1, self.num_readings + 1)]
+        if self.df is None:
+            cache_file = self.csv_file.with_suffix('.parquet')
+            if row_idx is not None and pa is not None and self._cache_is_fresh(cache_file):
+                # Streaming mode and a single profile wanted: scan just this
+                # sensor's reading columns out of the Parquet cache
+                table = ds.dataset(cache_file).to_table(
+                    columns=self._reading_cols,
+                    filter=ds.field('sensor_id') == sensor_id)
+                return self._to_readings(table.take([row_idx]).to_pandas())[0]
+            
+            # Streaming mode only kept statistics; load the rows now
+            self._load_data()
         
-        sensor_df = self.df[self.df['sensor_id'] == sensor_id]
+        data = self._sensor_cache.get(sensor_id, self._empty_readings)
         
         if row_idx is not None:
-            return pd.to_numeric(sensor_df.iloc[row_idx][cols], errors='coerce').fillna(0).values
+            return data[row_idx]
         else:
-            return sensor_df[cols].apply(pd.to_numeric, errors='coerce').fillna(0).values
+            return data
+    
+    @cached_property
+    def distance_axis(self) -> np.ndarray:
+        """Distance axis in cm for plotting (built once per analyzer)."""
+        return np.arange(self.num_readings) * self.cm_per_reading
     
     def get_distance_axis(self) -> np.ndarray:
         """Get distance axis in cm for plotting."""
-        return np.arange(self.num_readings) * self.cm_per_reading
+        return self.distance_axis
     
     def plot_echo_profile(self, sensor_id: int, row_idx: int = 0, 
                           ax: plt.Axes = None, show: bool = True):
@@ -99,7 +271,7 @@ class EchoProfileAnalyzer:
             fig, ax = plt.subplots(figsize=(12, 6))
         
         readings = self.get_sensor_data(sensor_id, row_idx)
-        distances = self.get_distance_axis()
+        distances = self.distance_axis
         
         # Plot echo profile
         ax.plot(distances, readings, linewidth=1.5, color='#2E86AB')
@@ -121,7 +293,8 @@ class EchoProfileAnalyzer:
             plt.show()
     
     def plot_heatmap(self, sensor_id: int, start_row: int = 0, 
-                     end_row: int = None, ax: plt.Axes = None, show: bool = True):
+                     end_row: int = None, ax: plt.Axes = None, show: bool = True,
+                     max_rows: int = 1000):
         """
         Plot heatmap showing echo profiles over time.
         
@@ -131,24 +304,52 @@ class EchoProfileAnalyzer:
             end_row: Last row to include (None = all)
             ax: Matplotlib axes (creates new if None)
             show: Whether to display plot immediately
+            max_rows: Rows above this are max-pooled in blocks before drawing
         """
-        if ax is None:
-            fig, ax = plt.subplots(figsize=(14, 8))
-        
         data = self.get_sensor_data(sensor_id)
         
         if end_row is None:
             end_row = len(data)
         
         data_slice = data[start_row:end_row]
+        num_rows = len(data_slice)
+        
+        # Long captures have far more rows than the plot has pixels. Keep
+        # each block's peak so brief echoes still show up.
+        if num_rows > max_rows:
+            block = -(-num_rows // max_rows)  # Ceiling division
+            data_slice = np.maximum.reduceat(data_slice, np.arange(0, num_rows, block), axis=0)
+        
+        # The extent keeps the y-axis in trigger events when rows are pooled
+        extent = (-0.5, self.num_readings - 0.5, -0.5, num_rows - 0.5)
+        title = f'Sensor {sensor_id} - Echo Envelope Heatmap'
+        
+        if (ax is None and self._heatmap_fig is not None and
+                plt.fignum_exists(self._heatmap_fig.number)):
+            # Heatmap window still open: swap in the new image rather than
+            # rebuilding the figure, ticks and colorbar
+            self._heatmap_im.set_data(data_slice)
+            self._heatmap_im.set_extent(extent)
+            self._heatmap_im.axes.set_title(title, fontsize=14)
+            self._heatmap_fig.canvas.draw_idle()
+            if show:
+                plt.show()
+            return
+        
+        standalone = ax is None
+        if standalone:
+            fig, ax = plt.subplots(figsize=(14, 8))
         
         im = ax.imshow(data_slice, aspect='auto', cmap='hot', 
                        interpolation='bilinear', origin='lower',
+                       extent=extent,
                        vmin=0, vmax=200)  # Limit scale for better contrast
+        if standalone:
+            self._heatmap_fig, self._heatmap_im = fig, im
         
         ax.set_xlabel('Distance (cm)', fontsize=12)
         ax.set_ylabel('Trigger Event (time →)', fontsize=12)
-        ax.set_title(f'Sensor {sensor_id} - Echo Envelope Heatmap', fontsize=14)
+        ax.set_title(title, fontsize=14)
         
         # Add distance markers on x-axis
         xticks = np.arange(0, self.num_readings, 30)
@@ -163,7 +364,8 @@ class EchoProfileAnalyzer:
             plt.show()
     
     def detect_objects(self, sensor_id: int, row_idx: int, 
-                       threshold: int = 50, min_width: int = 3) -> list:
+                       threshold: int = 50, min_width: int = 3,
+                       target_count: int = None) -> list:
         """
         Detect objects from echo profile peaks.
         
@@ -172,38 +374,63 @@ class EchoProfileAnalyzer:
             row_idx: Which trigger event to analyze
             threshold: Minimum ADC value to consider as object
             min_width: Minimum number of consecutive readings for valid object
+            target_count: If set, ignore threshold and bisect for one at which
+                at most this many objects are found (not necessarily the
+                lowest such threshold)
             
         Returns:
             List of dicts with object info: [{'distance_cm': float, 'strength': int, 'width_cm': float}, ...]
         """
         readings = self.get_sensor_data(sensor_id, row_idx)
-        distances = self.get_distance_axis()
-        
-        objects = []
-        in_object = False
-        object_start = 0
-        object_peak = 0
-        
-        for i, value in enumerate(readings):
-            if value >= threshold:
-                if not in_object:
-                    in_object = True
-                    object_start = i
-                    object_peak = value
-                else:
-                    object_peak = max(object_peak, value)
+        if target_count is not None:
+            threshold = self._threshold_for_count(readings, target_count, min_width)
+        return self._find_objects(readings, threshold, min_width)
+    
+    def _threshold_for_count(self, readings: np.ndarray, target_count: int,
+                             min_width: int) -> int:
+        """
+        Find a threshold at which the object count is <= target_count, by bisection.
+        
+        The count isn't monotonic in the threshold (raising it can split one
+        run into two), so this is not guaranteed to be the lowest such
+        threshold; a linear scan could settle on a different one.
+        """
+        # Above the peak nothing is detected, so hi always satisfies the count
+        lo, hi = int(readings.min()) + 1, int(readings.max()) + 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if len(self._find_objects(readings, mid, min_width)) <= target_count:
+                hi = mid
             else:
-                if in_object:
-                    object_width = i - object_start
-                    if object_width >= min_width:
-                        objects.append({
-                            'distance_cm': round(distances[object_start + object_width // 2], 1),
-                            'strength': object_peak,
-                            'width_cm': round(object_width * self.cm_per_reading, 1)
-                        })
-                    in_object = False
-        
-        return objects
+                lo = mid + 1
+        return hi
+    
+    def _find_objects(self, readings: np.ndarray, threshold: int, min_width: int) -> list:
+        """Find runs of at least min_width readings at or above threshold in one profile."""
+        distances = self.distance_axis
+        
+        # Find runs above threshold from the rising/falling edges of the mask
+        edges = np.diff((readings >= threshold).view(np.int8), prepend=0)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        
+        # A run still open at the end of the profile is not an object
+        starts = starts[:len(ends)]
+        if not len(starts):
+            return []
+        
+        widths = ends - starts
+        peaks = np.maximum.reduceat(readings, np.column_stack((starts, ends)).ravel())[::2]
+        valid = widths >= min_width
+        
+        return [
+            {
+                'distance_cm': round(distances[start + width // 2], 1),
+                'strength': peak,
+                'width_cm': round(width * self.cm_per_reading, 1)
+            }
+            for start, width, peak in zip(starts[valid].tolist(), widths[valid].tolist(), peaks[valid])
+        ]
     
     def plot_comparison(self, row_idx: int = 0, show: bool = True):
         """
@@ -247,12 +474,8 @@ class EchoProfileAnalyzer:
         start_idx = max(0, reading_idx - window_readings)
         end_idx = min(self.num_readings, reading_idx + window_readings)
         
-        data = self.get_sensor_data(sensor_id)
-        
         # Average over window
-        values = data[:, start_idx:end_idx].mean(axis=1)
-        
-        sensor_df = self.df[self.df['sensor_id'] == sensor_id].reset_index(drop=True)
+        values = self._window_mean(sensor_id, start_idx, end_idx)
         
         ax.plot(values, linewidth=1.5, marker='o', markersize=4)
         ax.set_xlabel('Trigger Event', fontsize=12)
@@ -265,6 +488,27 @@ class EchoProfileAnalyzer:
             plt.tight_layout()
             plt.show()
     
+    def _window_mean(self, sensor_id: int, start_idx: int, end_idx: int) -> np.ndarray:
+        """Mean of each trigger's readings[start_idx:end_idx], from running sums."""
+        cumsum = self._cumsum_cache.get(sensor_id) if self.df is not None else None
+        if cumsum is None:
+            data = self.get_sensor_data(sensor_id)
+            # Leading zero column so any window is just two lookups;
+            # 240 × 10-bit readings can't overflow uint32
+            cumsum = np.zeros((len(data), self.num_readings + 1), dtype=np.uint32)
+            np.cumsum(data, axis=1, out=cumsum[:, 1:])
+            self._cumsum_cache[sensor_id] = cumsum
+        
+        # Windows beyond the last reading are empty; like a mean over an
+        # empty slice, they average to NaN
+        start_idx = min(max(start_idx, 0), self.num_readings)
+        end_idx = min(max(end_idx, 0), self.num_readings)
+        if end_idx <= start_idx:
+            return np.full(len(cumsum), np.nan, dtype=np.float32)
+        
+        window_sums = cumsum[:, end_idx] - cumsum[:, start_idx]
+        return (window_sums / (end_idx - start_idx)).astype(np.float32)
+    
     def plot_distance_vs_time(self, sensor_id: int, threshold: int = 50,
                               ax: plt.Axes = None, show: bool = True):
         """
@@ -280,29 +524,16 @@ class EchoProfileAnalyzer:
             fig, ax = plt.subplots(figsize=(12, 6))
         
         data = self.get_sensor_data(sensor_id)
-        distances = self.get_distance_axis()
+        distances = self.distance_axis
         
-        detected_distances = []
-        detected_strengths = []
+        # For each trigger event, find the strongest echo; events whose
+        # strongest echo is below threshold have no detection
+        max_idx = data.argmax(axis=1)
+        max_val = data[np.arange(len(data)), max_idx]
+        valid = max_val >= threshold
         
-        # For each trigger event, find the strongest echo
-        for row_idx in range(len(data)):
-            readings = data[row_idx]
-            
-            # Find peaks above threshold
-            above_threshold = readings >= threshold
-            if above_threshold.any():
-                # Get distance of strongest echo
-                max_idx = np.argmax(readings)
-                if readings[max_idx] >= threshold:
-                    detected_distances.append(distances[max_idx])
-                    detected_strengths.append(readings[max_idx])
-                else:
-                    detected_distances.append(np.nan)
-                    detected_strengths.append(np.nan)
-            else:
-                detected_distances.append(np.nan)
-                detected_strengths.append(np.nan)
+        detected_distances = np.where(valid, distances[max_idx], np.nan)
+        detected_strengths = np.where(valid, max_val, np.nan)
         
         # Plot distance over time
         trigger_events = np.arange(len(detected_distances))
@@ -329,6 +560,31 @@ class EchoProfileAnalyzer:
             plt.tight_layout()
             plt.show()
     
+    def _sensor_stats(self, sensor_id: int) -> dict:
+        """Summary statistics for one sensor, from the streamed totals if available."""
+        if self._stream_stats is not None:
+            return self._stream_stats[sensor_id]
+        
+        data = self.get_sensor_data(sensor_id)
+        
+        # One pass over the readings: a histogram of ADC values holds every
+        # statistic the report needs, and it's tiny to reduce further
+        counts = np.bincount(data.ravel())
+        values = np.arange(len(counts), dtype=np.float64)
+        present = np.flatnonzero(counts)
+        
+        n = data.size
+        mean = (counts @ values) / n
+        variance = (counts @ values ** 2) / n - mean ** 2
+        return {
+            'mean': mean,
+            'max': present[-1],
+            'min': present[0],
+            'std': np.sqrt(max(variance, 0.0)),
+            'strong_echoes': counts[101:].sum(),
+            'first_trigger': data[0]
+        }
+    
     def generate_report(self, output_file: str = None):
         """
         Generate summary report of data.
@@ -346,31 +602,36 @@ class EchoProfileAnalyzer:
         
         report.append("DATA SUMMARY")
         report.append("-" * 70)
-        num_sensors = len(self.df['sensor_id'].unique())
-        num_triggers = len(self.df) // num_sensors
+        num_triggers = self.num_rows // len(self.sensor_ids)
         report.append(f"Total trigger events: {num_triggers}")
         report.append(f"Readings per sensor: {self.num_readings}")
         report.append(f"Spatial resolution: {self.cm_per_reading:.2f} cm/reading")
         report.append(f"Maximum range: {self.num_readings * self.cm_per_reading:.1f} cm")
         report.append("")
         
-        for sensor_id in sorted(self.df['sensor_id'].unique()):
+        if self._stream_stats is not None:
+            # Already totalled during the streamed read; just look them up
+            all_stats = [self._sensor_stats(sensor_id) for sensor_id in self.sensor_ids]
+        else:
+            # Sensors are independent and np.bincount, the bulk of the work,
+            # releases the GIL, so their statistics can be computed side by side
+            with ThreadPoolExecutor(max_workers=len(self.sensor_ids)) as executor:
+                all_stats = list(executor.map(self._sensor_stats, self.sensor_ids))
+        
+        for sensor_id, stats in zip(self.sensor_ids, all_stats):
             report.append(f"SENSOR {sensor_id} STATISTICS")
             report.append("-" * 70)
             
-            data = self.get_sensor_data(sensor_id)
-            
-            report.append(f"Mean amplitude: {data.mean():.1f} ADC")
-            report.append(f"Max amplitude: {data.max()} ADC")
-            report.append(f"Min amplitude: {data.min()} ADC")
-            report.append(f"Std deviation: {data.std():.1f} ADC")
+            report.append(f"Mean amplitude: {stats['mean']:.1f} ADC")
+            report.append(f"Max amplitude: {stats['max']} ADC")
+            report.append(f"Min amplitude: {stats['min']} ADC")
+            report.append(f"Std deviation: {stats['std']:.1f} ADC")
             
             # Count strong echoes
-            strong_echoes = (data > 100).sum()
-            report.append(f"Strong echoes (>100 ADC): {strong_echoes:,} samples")
+            report.append(f"Strong echoes (>100 ADC): {stats['strong_echoes']:,} samples")
             
             # Detect objects in first trigger
-            objects = self.detect_objects(sensor_id, 0, threshold=50)
+            objects = self._find_objects(stats['first_trigger'], threshold=50, min_width=3)
             report.append(f"Objects detected (first trigger): {len(objects)}")
             if objects:
                 for i, obj in enumerate(objects, 1):
@@ -402,7 +663,7 @@ def main():
     parser.add_argument('--end-row', type=int, default=None,
                        help='End row for heatmap (default: all)')
     parser.add_argument('--plot-type', 
-                       choices=['profile', 'heatmap', 'comparison', 'timeseries', 'distance', 'all'],
+                       choices=['profile', 'heatmap', 'comparison', 'timeseries', 'distance', 'all', 'none'],
                        default='all', 
                        help='Type of plot to generate (default: all)')
     parser.add_argument('--distance', type=float, default=50,
@@ -412,13 +673,17 @@ def main():
     parser.add_argument('--report', action='store_true',
                        help='Generate summary report')
     parser.add_argument('--output', help='Output file for report')
+    parser.add_argument('--streaming', action='store_true',
+                       help='Compute the report in one chunked pass (bounded memory)')
     parser.add_argument('--detect', action='store_true',
                        help='Detect and list objects')
+    parser.add_argument('--target-count', type=int, default=None,
+                       help='With --detect, bisect for a threshold that finds at most this many objects')
     
     args = parser.parse_args()
     
     # Load and analyze data
-    analyzer = EchoProfileAnalyzer(args.data_file)
+    analyzer = EchoProfileAnalyzer(args.data_file, streaming=args.streaming)
     
     print()  # Blank line for readability
     
@@ -431,7 +696,8 @@ def main():
     if args.detect:
         print(f"Object Detection (Sensor {args.sensor}, Trigger {args.row}):")
         print("-" * 70)
-        objects = analyzer.detect_objects(args.sensor, args.row, threshold=50)
+        objects = analyzer.detect_objects(args.sensor, args.row, threshold=50,
+                                          target_count=args.target_count)
         if objects:
             for i, obj in enumerate(objects, 1):
                 print(f"  Object {i}: Distance={obj['distance_cm']}cm, "
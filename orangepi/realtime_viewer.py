@@ -9,7 +9,8 @@ Requires matplotlib for plotting.
 import serial
 import yaml
 import time
-from collections import deque
+import threading
+import numpy as np
 from datetime import datetime
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
@@ -25,14 +26,23 @@ class RealtimeViewer:
         self.history_size = history_size
         self.num_sensors = self.config['sensors']['count']
         
-        # Data storage for plotting
-        self.timestamps = deque(maxlen=history_size)
-        self.sensor_data = [deque(maxlen=history_size) for _ in range(self.num_sensors)]
+        # Data storage for plotting: ring buffers written twice, at i and
+        # i + history_size, so the latest history is always one contiguous slice
+        self.timestamps = np.empty(2 * history_size, dtype=np.float32)
+        self.sensor_data = np.empty((self.num_sensors, 2 * history_size), dtype=np.float32)
+        self._head = 0   # Next slot to write
+        self._count = 0  # Valid samples, up to history_size
         
         # Serial connection
         self.serial_conn = None
         self.start_time = time.time()
         
+        # Serial reading runs on its own thread so the animation callback
+        # never blocks on I/O; the lock guards the buffers shared with it
+        self.is_running = False
+        self.read_thread = None
+        self._lock = threading.Lock()
+        
     def _load_config(self, config_path: str):
         """Load configuration from YAML file."""
         with open(config_path, 'r') as f:
@@ -46,6 +56,13 @@ class RealtimeViewer:
                 baudrate=self.config['arduino']['baudrate'],
                 timeout=self.config['arduino']['timeout']
             )
+            
+            # Low-latency mode keeps the plot in step with the sensor (Linux only)
+            try:
+                self.serial_conn.set_low_latency_mode(True)
+            except (AttributeError, ValueError):
+                pass
+            
             time.sleep(2)
             
             # Clear initialization messages
@@ -66,6 +83,10 @@ class RealtimeViewer:
         samples = self.config['sensors']['samples_per_trigger']
         self.serial_conn.write(f"START:{samples}\n".encode('utf-8'))
         
+        self.is_running = True
+        self.read_thread = threading.Thread(target=self._read_serial_loop, daemon=True)
+        self.read_thread.start()
+        
         # Setup plot
         fig, ax = plt.subplots(figsize=(12, 6))
         lines = []
@@ -85,52 +106,88 @@ class RealtimeViewer:
             return lines
         
         def update(frame):
-            # Read data from serial
-            if self.serial_conn and self.serial_conn.in_waiting:
-                line = self.serial_conn.readline().decode('utf-8').strip()
-                
-                if line.startswith('S,'):
-                    try:
-                        parts = line.split(',')
-                        timestamp = (time.time() - self.start_time)
-                        self.timestamps.append(timestamp)
-                        
-                        for i, value in enumerate(parts[2:]):
-                            adc_value = int(value)
-                            distance = adc_value  # MB1300: ADC ≈ cm at 5V
-                            self.sensor_data[i].append(distance)
-                    except Exception as e:
-                        pass
+            # Snapshot the data gathered by the reader thread
+            with self._lock:
+                start = (self._head - self._count) % self.history_size
+                end = start + self._count
+                timestamps = self.timestamps[start:end].copy()
+                sensor_data = self.sensor_data[:, start:end].copy()
             
             # Update plot
-            if self.timestamps:
+            if len(timestamps):
                 for i, line in enumerate(lines):
-                    line.set_data(list(self.timestamps), list(self.sensor_data[i]))
+                    line.set_data(timestamps, sensor_data[i])
                 
                 # Auto-scale x-axis
-                if len(self.timestamps) > 0:
-                    ax.set_xlim(max(0, self.timestamps[-1] - 10), 
-                               self.timestamps[-1] + 1)
+                ax.set_xlim(max(0, timestamps[-1] - 10), timestamps[-1] + 1)
                 
                 # Auto-scale y-axis based on data
-                all_data = [val for sensor in self.sensor_data for val in sensor]
-                if all_data:
-                    min_val = min(all_data)
-                    max_val = max(all_data)
-                    margin = (max_val - min_val) * 0.1
-                    ax.set_ylim(max(0, min_val - margin), max_val + margin)
+                min_val = sensor_data.min()
+                max_val = sensor_data.max()
+                margin = (max_val - min_val) * 0.1
+                ax.set_ylim(max(0, min_val - margin), max_val + margin)
             
             return lines
         
+        # Frames are an endless counter; don't keep a cache of them around
         ani = animation.FuncAnimation(fig, update, init_func=init,
-                                     interval=50, blit=True)
+                                     interval=50, blit=True,
+                                     cache_frame_data=False)
         
         plt.show()
         
         # Cleanup
-        if self.serial_conn:
+        self.is_running = False
+        if self.read_thread:
+            self.read_thread.join()
+        if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.write(b"STOP\n")
             self.serial_conn.close()
+    
+    def _read_serial_loop(self):
+        """Read sensor lines from the Arduino into the plot history (runs in separate thread)."""
+        residual = b''  # Partial line carried over to the next read
+        
+        while self.is_running:
+            try:
+                # Drain everything already buffered in one call; when idle the
+                # 1-byte read blocks until data arrives or the timeout expires
+                chunk = self.serial_conn.read(self.serial_conn.in_waiting or 1)
+            except serial.SerialException as e:
+                # Port gone (e.g. USB cable pulled); retrying would just spin
+                print(f"Serial connection lost: {e}")
+                self.is_running = False
+                self.serial_conn.close()
+                break
+            if not chunk:
+                continue
+            
+            lines = (residual + chunk).split(b'\n')
+            residual = lines.pop()
+            
+            samples = []
+            for line in lines:
+                if not line.startswith(b'S,'):
+                    continue
+                try:
+                    # Only the leading per-sensor values are plotted, so split
+                    # just far enough to reach them. MB1300: ADC ≈ cm at 5V
+                    parts = line.split(b',', 2 + self.num_sensors)
+                    distances = [int(value) for value in parts[2:2 + self.num_sensors]]
+                except ValueError:
+                    continue
+                if len(distances) != self.num_sensors:
+                    continue
+                samples.append((time.time() - self.start_time, distances))
+            
+            with self._lock:
+                for timestamp, distances in samples:
+                    i = self._head
+                    j = i + self.history_size
+                    self.timestamps[i] = self.timestamps[j] = timestamp
+                    self.sensor_data[:, i] = self.sensor_data[:, j] = distances
+                    self._head = (i + 1) % self.history_size
+                    self._count = min(self._count + 1, self.history_size)
 
 
 def main():
@@ -5,104 +5,280 @@ System Test Script
 Tests the connection and basic functionality of the ultrasonic detection system.
 """
 
-import serial
+import os
+import io
+import errno
+import select
 import time
-import yaml
+import json
+import numpy as np
 from pathlib import Path
+from types import MappingProxyType
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
+# yaml and serial are imported where they're used: both are slow to import,
+# and a run with a fresh JSON config cache never needs yaml at all
 
-def load_config(config_path="../config.yaml"):
-    """Load configuration."""
-    with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
+# Parsed configs keyed by resolved path: (mtime_ns, size, config)
+_config_cache = {}
 
+# Distances are handled as int16 tenths of a cm: exact integer math, and the
+# 10-bit ADC range (up to ~1023 cm) fits easily
+_TENTHS_PER_CM = 10
 
-def test_arduino_connection(config):
+# Arduino protocol, as sent and matched on the wire
+_SAMPLES_PER_TRIGGER = 5
+_CMD_START = b"START:%d\n" % _SAMPLES_PER_TRIGGER
+_CMD_STOP = b"STOP\n"
+_READY = b"READY"
+_MODE = b"MODE:"  # Last line of the startup banner
+_ACK_STARTED = b"ACK:STARTED"
+_ERROR = b"ERROR"
+_SAMPLE_PREFIX = b"S,"
+_SAMPLES_TO_COLLECT = 5
+
+# Printed in one go when the serial port can't be opened
+_TROUBLESHOOTING = (
+    "\nTroubleshooting:\n"
+    "  1. Check that Arduino is connected to {port}\n"
+    "  2. Try: ls /dev/tty* to find the correct port\n"
+    "  3. Check permissions: sudo chmod 666 {port}\n"
+    "  4. Verify Arduino code is uploaded"
+)
+
+
+def load_config(config_path="../config.yaml", use_cache=True):
+    """Load configuration, re-parsing only when the file has changed."""
+    path = Path(config_path).resolve()
+    st = path.stat()
+    
+    cached = _config_cache.get(path) if use_cache else None
+    if cached is None or cached[:2] != (st.st_mtime_ns, st.st_size):
+        config = _freeze(_read_config(path, st, use_cache))
+        cached = (st.st_mtime_ns, st.st_size, config)
+        _config_cache[path] = cached
+    
+    # Read-only, so callers can share the cached copy safely
+    return cached[2]
+
+
+def _freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _read_config(path, st, use_cache=True):
+    """Parse the YAML config, going through a JSON sidecar that's quicker to load."""
+    json_path = path.with_suffix(path.suffix + '.json')
+    
+    # The sidecar records the mtime and size of the YAML it came from and is
+    # only used on an exact match, so a config restored with an older mtime
+    # (cp -p, rsync -a, git checkout) isn't shadowed by a stale cache
+    source = [st.st_mtime_ns, st.st_size]
+    
+    if use_cache:
+        try:
+            cached = json.loads(json_path.read_text())
+            if cached['source'] == source:
+                return cached['config']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # Missing, unreadable or old-format sidecar; fall back to the YAML
+    
+    import yaml
+    try:
+        from yaml import CSafeLoader as SafeLoader  # libyaml-backed, much faster
+    except ImportError:
+        from yaml import SafeLoader
+        print("  Note: PyYAML was built without libyaml; using its slower pure-Python "
+              "loader (see SETUP_ORANGEPI.md)")
+    
+    with open(path, 'r') as f:
+        config = yaml.load(f, Loader=SafeLoader)
+    
+    # Write via a temp file so a half-written sidecar is never picked up
+    try:
+        tmp_path = json_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'source': source, 'config': config}))
+        tmp_path.replace(json_path)
+    except (OSError, TypeError):
+        pass  # Read-only directory or values JSON can't hold; just skip the cache
+    
+    return config
+
+
+def _open_serial(config):
+    """
+    Open the Arduino's serial port and wait for it to initialize.
+    
+    Returns:
+        (serial connection, startup messages read while waiting)
+    """
+    import serial
+    
+    ser = serial.Serial(
+        port=config['arduino']['port'],
+        baudrate=config['arduino']['baudrate'],
+        timeout=config['arduino']['timeout']
+    )
+    
+    # Low-latency mode stops USB-serial adapters holding bytes back for
+    # their 16ms latency timer (Linux only)
+    try:
+        ser.set_low_latency_mode(True)
+    except (AttributeError, ValueError):
+        pass
+    
+    # Opening the port resets the Arduino; go as soon as it reports READY
+    # rather than sleeping for a fixed worst case
+    return ser, _wait_ready(ser)
+
+
+def _wait_ready(ser, timeout=2.5, quiet=0.1):
+    """
+    Read the Arduino's startup banner.
+    
+    Stops once READY and the MODE line that ends the banner have arrived, when
+    the line goes quiet for `quiet` seconds after READY, or at the timeout.
+    """
+    deadline = time.monotonic() + timeout
+    startup = bytearray()
+    last_data = time.monotonic()
+    
+    # A short read timeout keeps each read inside the deadline. Set it once:
+    # every change to it reconfigures the port
+    read_timeout = ser.timeout
+    ser.timeout = 0.05
+    
+    try:
+        while time.monotonic() < deadline:
+            chunk = ser.read(ser.in_waiting or 1)
+            if chunk:
+                startup.extend(chunk)
+                last_data = time.monotonic()
+            
+            ready = startup.find(_READY)
+            if ready == -1:
+                continue
+            mode = startup.find(_MODE, ready)
+            if mode != -1 and b'\n' in startup[mode:]:
+                break  # Whole banner received
+            if not chunk and time.monotonic() - last_data >= quiet:
+                break  # READY seen and nothing more is coming
+    finally:
+        ser.timeout = read_timeout
+    
+    return bytes(startup)
+
+
+def test_arduino_connection(config, ser, startup=b""):
     """Test connection to Arduino."""
-    print("Testing Arduino connection...")
+    import serial
+    
+    print("\nTesting Arduino connection...")
     
     try:
-        ser = serial.Serial(
-            port=config['arduino']['port'],
-            baudrate=config['arduino']['baudrate'],
-            timeout=config['arduino']['timeout']
-        )
-        
-        time.sleep(2)  # Wait for Arduino to initialize
+        # Initialization messages: those read while waiting for READY plus
+        # any that followed it
+        data = startup + ser.read(ser.in_waiting)
+        messages = [line.strip() for line in data.decode('utf-8', 'replace').splitlines()]
+        if messages:
+            print("\n".join(f"  Arduino: {line}" for line in messages))
         
-        # Read initialization messages
-        messages = []
-        while ser.in_waiting:
-            line = ser.readline().decode('utf-8').strip()
-            messages.append(line)
-            print(f"  Arduino: {line}")
-        
-        if any("READY" in msg for msg in messages):
+        if _READY in data:
             print("✓ Arduino connection successful")
-            ser.close()
             return True
         else:
             print("✗ Arduino not responding correctly")
-            ser.close()
             return False
             
     except serial.SerialException as e:
         print(f"✗ Connection failed: {e}")
-        print(f"\nTroubleshooting:")
-        print(f"  1. Check that Arduino is connected to {config['arduino']['port']}")
-        print(f"  2. Try: ls /dev/tty* to find the correct port")
-        print(f"  3. Check permissions: sudo chmod 666 {config['arduino']['port']}")
-        print(f"  4. Verify Arduino code is uploaded")
         return False
 
 
-def test_data_collection(config):
+def test_data_collection(config, ser):
     """Test data collection."""
     print("\nTesting data collection...")
     
     try:
-        ser = serial.Serial(
-            port=config['arduino']['port'],
-            baudrate=config['arduino']['baudrate'],
-            timeout=config['arduino']['timeout']
-        )
-        
-        time.sleep(2)
-        
-        # Clear buffer
-        while ser.in_waiting:
-            ser.readline()
+        # Clear anything left over from the connection test
+        ser.reset_input_buffer()
         
         # Start collection
         print("  Sending START command...")
-        ser.write(b"START:5\n")
+        ser.write(_CMD_START)
         
-        # Wait for acknowledgment
-        response = ser.readline().decode('utf-8').strip()
-        print(f"  Response: {response}")
+        # Wait for acknowledgment, skipping anything else still arriving (such
+        # as the tail of the startup banner). read_until's timeout bounds the
+        # whole line, not each byte as with readline()
+        ack_deadline = time.monotonic() + config['arduino']['timeout']
+        while True:
+            response = ser.read_until(b'\n')
+            if (not response or _ACK_STARTED in response or
+                    response.startswith(_ERROR) or time.monotonic() >= ack_deadline):
+                break
+        print(f"  Response: {response.decode('utf-8', 'replace').strip()}")
         
-        if "ACK:STARTED" not in response:
+        if _ACK_STARTED not in response:
             print("✗ Failed to start data collection")
-            ser.close()
             return False
         
         # Collect some data
         print("  Collecting data samples...")
-        samples = []
-        timeout = time.time() + 5  # 5 second timeout
+        samples = [None] * _SAMPLES_TO_COLLECT  # Filled in place, trimmed below
+        count = 0
+        buffer = bytearray()  # Partial line carried over to the next read
+        # 5 second timeout, on the monotonic clock so NTP adjustments can't
+        # stretch or cut short the window
+        deadline_ns = time.monotonic_ns() + 5_000_000_000
+        
+        # POSIX ports expose their file descriptor, so wait on it with poll()
+        # and stay inside the deadline; elsewhere fall back to a blocking read
+        fd = getattr(ser, 'fd', None)
+        poller = None
+        if fd is not None and hasattr(select, 'poll'):
+            poller = select.poll()
+            poller.register(fd, select.POLLIN)
         
-        while len(samples) < 5 and time.time() < timeout:
-            if ser.in_waiting:
-                line = ser.readline().decode('utf-8').strip()
-                if line.startswith('S,'):
-                    samples.append(line)
-                    print(f"    Sample {len(samples)}: {line}")
+        while count < _SAMPLES_TO_COLLECT and time.monotonic_ns() < deadline_ns:
+            if poller is not None and not poller.poll(50):
+                continue  # Nothing yet; recheck the deadline
+            
+            # Take everything the driver has buffered in one call
+            buffer.extend(ser.read(ser.in_waiting or 1))
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                # Match on the raw bytes; only samples get decoded, for display
+                if line.startswith(_SAMPLE_PREFIX) and count < _SAMPLES_TO_COLLECT:
+                    samples[count] = line
+                    count += 1
         
         # Stop collection
-        ser.write(b"STOP\n")
-        ser.readline()  # Read ACK
+        ser.write(_CMD_STOP)
+        ser.read_until(b'\n')  # Read ACK
+        
+        del samples[count:]
         
-        ser.close()
+        # Report the samples in one write, after the timed window
+        if samples:
+            print("\n".join(f"    Sample {i}: {line.decode('utf-8', 'replace').strip()}"
+                            for i, line in enumerate(samples, 1)))
+            
+            # Validate the whole batch at once: every field an integer, the
+            # same number per sample, and Arduino timestamps counting up
+            try:
+                values = _parse_samples(samples)
+            except ValueError as e:
+                print(f"✗ Malformed sample data: {e}")
+                return False
+            if not np.all(np.diff(values[:, 0]) > 0):
+                print("✗ Sample timestamps are not increasing")
+                return False
         
         if len(samples) >= 3:
             print(f"✓ Data collection successful ({len(samples)} samples)")
@@ -116,26 +292,54 @@ def test_data_collection(config):
         return False
 
 
-def test_distance_calculation():
-    """Test distance calculation function."""
-    print("\nTesting distance calculation...")
+def _parse_samples(samples):
+    """Parse raw 'S,<timestamp>,<values...>' lines into an int array, one row per sample."""
+    batch = b"\n".join(line[len(_SAMPLE_PREFIX):].strip() for line in samples)
+    return np.loadtxt(io.BytesIO(batch), delimiter=',', dtype=np.int64, ndmin=2)
+
+
+@lru_cache(maxsize=1)
+def _check_distances():
+    """
+    Run the distance test cases.
+    
+    Pure, so repeated runs in one process (e.g. under a watch loop) reuse
+    the first result.
     
-    test_cases = [
+    Returns:
+        (per-case report lines, whether all cases passed)
+    """
+    test_cases = np.array([
         (100, 100.0),   # 100 ADC = ~100cm
         (200, 200.0),   # 200 ADC = ~200cm
         (0, 0.0),       # 0 ADC = 0cm
-    ]
+    ])
+    adcs = test_cases[:, 0].astype(np.int16)
+    expected = np.round(test_cases[:, 1] * _TENTHS_PER_CM).astype(np.int16)
     
     def adc_to_distance(adc):
-        return adc  # At 5V: ADC value directly approximates cm (~4.9mV/cm)
+        # At 5V: ADC value directly approximates cm (~4.9mV/cm)
+        return (adc.astype(np.int32) * _TENTHS_PER_CM).astype(np.int16)
+    
+    # Check every case in one array operation, exactly in tenths of a cm
+    results = adc_to_distance(adcs)
+    passed = results == expected
+    all_passed = bool(passed.all())
+    
+    lines = tuple(
+        f"  {'✓' if ok else '✗'} ADC={adc} → {result / _TENTHS_PER_CM:.1f}cm "
+        f"(expected {want / _TENTHS_PER_CM}cm)"
+        for adc, result, want, ok in zip(adcs, results, expected, passed)
+    )
+    return lines, all_passed
+
+
+def test_distance_calculation():
+    """Test distance calculation function."""
+    print("\nTesting distance calculation...")
     
-    all_passed = True
-    for adc, expected in test_cases:
-        result = adc_to_distance(adc)
-        passed = abs(result - expected) < 0.1
-        status = "✓" if passed else "✗"
-        print(f"  {status} ADC={adc} → {result:.1f}cm (expected {expected}cm)")
-        all_passed = all_passed and passed
+    lines, all_passed = _check_distances()
+    print("\n".join(lines))
     
     if all_passed:
         print("✓ Distance calculation correct")
@@ -145,6 +349,21 @@ def test_distance_calculation():
     return all_passed
 
 
+def _can_write(directory):
+    """Check a directory is writable without leaving anything behind in it."""
+    if hasattr(os, 'O_TMPFILE'):
+        # An unnamed file: nothing is created on (or journaled to) the SD card
+        try:
+            os.close(os.open(directory, os.O_TMPFILE | os.O_WRONLY, 0o600))
+            return True
+        except OSError as e:
+            if e.errno not in (errno.EOPNOTSUPP, errno.EISDIR):
+                return False
+    
+    # Not Linux, or a filesystem without O_TMPFILE support (e.g. vfat)
+    return os.access(directory, os.W_OK | os.X_OK)
+
+
 def test_file_system(config):
     """Test file system access."""
     print("\nTesting file system...")
@@ -157,9 +376,8 @@ def test_file_system(config):
         print(f"✓ Output directory accessible: {output_dir}")
         
         # Test write permission
-        test_file = output_dir / ".test_write"
-        test_file.write_text("test")
-        test_file.unlink()
+        if not _can_write(output_dir):
+            raise PermissionError(f"No write permission for {output_dir}")
         print("✓ Write permission confirmed")
         
         return True
@@ -171,25 +389,57 @@ def test_file_system(config):
 
 def main():
     """Run all tests."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Ultrasonic Detection System Test')
+    parser.add_argument('--no-cache', action='store_true',
+                      help='Parse config.yaml directly, ignoring its JSON cache')
+    
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("Ultrasonic Detection System - System Test")
     print("=" * 60)
     
     # Load configuration
     try:
-        config = load_config()
+        config = load_config(use_cache=not args.no_cache)
         print("\n✓ Configuration loaded")
     except Exception as e:
         print(f"\n✗ Failed to load configuration: {e}")
         return
     
+    import serial
+    
+    # The local tests don't need the Arduino, so run them while the port
+    # opens and the board resets; a single worker keeps their output in order
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        distance_result = executor.submit(test_distance_calculation)
+        file_system_result = executor.submit(test_file_system, config)
+        
+        # Both Arduino tests share one connection, so the board resets only once
+        try:
+            ser, startup = _open_serial(config)
+            connection_error = None
+        except serial.SerialException as e:
+            ser = None
+            connection_error = e
+    
+    if connection_error is not None:
+        print(f"\n✗ Connection failed: {connection_error}")
+        print(_TROUBLESHOOTING.format(port=config['arduino']['port']))
+    
     # Run tests
-    results = {
-        'Arduino Connection': test_arduino_connection(config),
-        'Data Collection': test_data_collection(config),
-        'Distance Calculation': test_distance_calculation(),
-        'File System': test_file_system(config),
-    }
+    try:
+        results = {
+            'Arduino Connection': ser is not None and test_arduino_connection(config, ser, startup),
+            'Data Collection': ser is not None and test_data_collection(config, ser),
+            'Distance Calculation': distance_result.result(),
+            'File System': file_system_result.result(),
+        }
+    finally:
+        if ser is not None:
+            ser.close()
     
     # Summary
     print("\n" + "=" * 60)
@@ -0,0 +1,63 @@
+"""Regression tests for the echo profile analyzer."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')  # No display needed
+import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'orangepi'))
+from echo_analyzer import EchoProfileAnalyzer
+
+
+NUM_READINGS = 240
+
+
+def write_capture(path, num_triggers=4, num_sensors=2):
+    """Write a small capture CSV in the collector's format."""
+    rng = np.random.default_rng(0)
+    header = ['system_timestamp', 'arduino_timestamp_ms', 'sensor_id']
+    header += [f'reading_{i}' for i in range(1, NUM_READINGS + 1)]
+    rows = [','.join(header)]
+    for trigger in range(num_triggers):
+        for sensor_id in range(1, num_sensors + 1):
+            readings = rng.integers(0, 1024, NUM_READINGS)
+            rows.append(','.join([f'2024-01-01 00:00:{trigger:02d}.000', str(trigger * 100),
+                                  str(sensor_id)] + [str(r) for r in readings]))
+    path.write_text('\n'.join(rows) + '\n')
+
+
+class TimeSeriesWindowTest(unittest.TestCase):
+    """plot_time_series averages over a distance window of each trigger."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        csv_file = Path(self.tmp.name) / 'capture.csv'
+        write_capture(csv_file)
+        self.analyzer = EchoProfileAnalyzer(str(csv_file))
+
+    def tearDown(self):
+        plt.close('all')
+        self.tmp.cleanup()
+
+    def test_window_matches_slice_mean(self):
+        data = self.analyzer.get_sensor_data(1)
+        values = self.analyzer._window_mean(1, 10, 40)
+        np.testing.assert_allclose(values, data[:, 10:40].mean(axis=1), rtol=1e-6)
+
+    def test_out_of_range_distance_gives_nan(self):
+        # 250cm and 300cm are past the last reading (~206cm)
+        for distance_cm in (250, 300):
+            start_idx = int(distance_cm / self.analyzer.cm_per_reading) - 5
+            values = self.analyzer._window_mean(1, start_idx, start_idx + 10)
+            self.assertEqual(len(values), 4)
+            self.assertTrue(np.isnan(values).all())
+            self.analyzer.plot_time_series(1, distance_cm, show=False)
+
+
+if __name__ == '__main__':
+    unittest.main()